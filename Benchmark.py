@@ -0,0 +1,173 @@
+from InferenceService import InferenceService
+
+import Constants
+import argparse
+import os
+import sys
+import threading
+import time
+import cv2
+import mediapipe as mp
+import numpy as np
+from PyQt6.QtCore import QCoreApplication
+
+
+def load_frames(source, count):
+    """Read the first frames of a video file or camera index."""
+    cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.resize(frame, (Constants.TEXTURE_WIDTH, Constants.TEXTURE_HEIGHT)))
+    cap.release()
+    return frames
+
+
+def run_threads(sources, target):
+    """Run one worker per camera and return the wall time."""
+    threads = [threading.Thread(target=target, args=(index, frames)) for index, frames in enumerate(sources)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def bench_holistic(sources):
+    """One MediaPipe Holistic graph per thread, as VideoThread runs today without the shared service."""
+    results = [[] for _ in sources]
+
+    def worker(index, frames):
+        with mp.solutions.holistic.Holistic(
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5,
+            model_complexity=0,
+            enable_segmentation=False
+        ) as holistic:
+            for frame in frames:
+                results[index].append(holistic.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)))
+
+    return run_threads(sources, worker), results
+
+
+def bench_pose(sources):
+    """MediaPipe Pose per thread: pose detector plus the same lite landmark model, used as the reference."""
+    results = [[] for _ in sources]
+
+    def worker(index, frames):
+        with mp.solutions.pose.Pose(
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5,
+            model_complexity=0,
+            enable_segmentation=False
+        ) as pose:
+            for frame in frames:
+                results[index].append(pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)))
+
+    return run_threads(sources, worker), results
+
+
+def bench_per_thread(sources):
+    """One interpreter per thread running exactly the shared service's model and ROI tracking."""
+    results = [[] for _ in sources]
+    threads = max(1, (os.cpu_count() or 1) // len(sources))
+
+    def worker(index, frames):
+        service = InferenceService(pool_size=1, threads=threads)
+        service.register(index)
+        slot = service.slots[index]
+        for frame in frames:
+            results[index].extend(service.infer([(slot, frame)]))
+
+    return run_threads(sources, worker), results
+
+
+def bench_shared(sources):
+    """Shared InferenceService fed by every camera, waiting for each result like a live camera would."""
+    service = InferenceService()
+    for index in range(len(sources)):
+        service.register(index)
+    service.start()
+    results = [[] for _ in sources]
+
+    def worker(index, frames):
+        for frame in frames:
+            service.submit(index, frame, time.time())
+            while (served := service.take_result(index)) is None:
+                time.sleep(0.0005)
+            results[index].append(served[0])
+
+    elapsed = run_threads(sources, worker)
+    stats = service.collect_stats(cumulative=True)
+    service.stop()
+    return elapsed, stats, results
+
+
+def landmark_array(results):
+    """Return (33, 3) x, y, visibility of a result, or None without a pose."""
+    if results is None or not results.pose_landmarks:
+        return None
+    return np.array([[landmark.x, landmark.y, landmark.visibility] for landmark in results.pose_landmarks.landmark])
+
+
+def compare_landmarks(results, reference):
+    """Pixel distance between visible landmarks, and frames where only one side found a pose."""
+    distances = []
+    missed = extra = 0
+    for camera_results, camera_reference in zip(results, reference):
+        for result, expected in zip(camera_results, camera_reference):
+            found, wanted = landmark_array(result), landmark_array(expected)
+            if wanted is None or found is None:
+                missed += wanted is not None
+                extra += found is not None
+                continue
+            visible = (found[:, 2] > 0.5) & (wanted[:, 2] > 0.5)
+            offset = (found[visible, :2] - wanted[visible, :2]) * (Constants.TEXTURE_WIDTH, Constants.TEXTURE_HEIGHT)
+            distances.extend(np.hypot(offset[:, 0], offset[:, 1]))
+    return (np.mean(distances) if distances else 0.0), missed, extra
+
+
+def report(name, elapsed, total, cameras):
+    print(f"{name}: {elapsed:.2f} s, {total / elapsed:.1f} frames/s, {total / elapsed / cameras:.1f} FPS per camera")
+
+
+def main():
+    """Compare per-thread Holistic and per-thread inference against the shared inference service on the same frames."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('sources', nargs='+', help="Video files or camera indexes, one per simulated camera")
+    parser.add_argument('--frames', type=int, default=300)
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv)
+    sources = [load_frames(source, args.frames) for source in args.sources]
+    total = sum(len(frames) for frames in sources)
+
+    holistic_elapsed, holistic = bench_holistic(sources)
+    report("Per-thread MediaPipe Holistic (current setup)", holistic_elapsed, total, len(sources))
+
+    elapsed, reference = bench_pose(sources)
+    report("Per-thread MediaPipe Pose (lite, with detector)", elapsed, total, len(sources))
+
+    elapsed, per_thread = bench_per_thread(sources)
+    report("Per-thread interpreter (same model and tracking)", elapsed, total, len(sources))
+
+    elapsed, stats, shared = bench_shared(sources)
+    report(f"Shared inference ({stats['mode']})", elapsed, total, len(sources))
+    print(f"  {holistic_elapsed / elapsed:.2f}x faster than per-thread Holistic")
+    print(f"  {stats['batches']} batches, {stats['batch_ms']} ms/batch, fairness {stats['fairness']}")
+    for index, camera in stats['cameras'].items():
+        print(f"  Camera {index}: {camera['served']} served, {camera['wait_ms']} ms wait, "
+              f"{camera['full_frame']} full-frame searches without a detector")
+
+    for name, results in (("Per-thread Holistic", holistic), ("Per-thread interpreter", per_thread),
+                          ("Shared inference", shared)):
+        distance, missed, extra = compare_landmarks(results, reference)
+        print(f"{name} vs Pose: {distance:.1f} px mean landmark offset, "
+              f"{missed} frames missed, {extra} frames found only here")
+
+
+if __name__ == "__main__":
+    main()
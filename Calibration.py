@@ -0,0 +1,176 @@
+import Constants
+import argparse
+import json
+import cv2
+import numpy as np
+
+
+class CameraCalibration:
+    """Intrinsics and board-relative extrinsics of one camera."""
+
+    def __init__(self, name, image_size, camera_matrix, dist_coeffs, rvec=None, tvec=None, rms=0.0):
+        self.name = name
+        self.image_size = tuple(image_size)  # (width, height) of the recorded video
+        self.camera_matrix = np.asarray(camera_matrix, dtype=np.float64)
+        self.dist_coeffs = np.asarray(dist_coeffs, dtype=np.float64).reshape(-1)
+        self.rvec = np.zeros(3) if rvec is None else np.asarray(rvec, dtype=np.float64).reshape(3)
+        self.tvec = np.zeros(3) if tvec is None else np.asarray(tvec, dtype=np.float64).reshape(3)
+        self.rms = rms
+
+    def projection_matrix(self):
+        """Return the 3x4 matrix K [R|t] mapping world points to undistorted pixels."""
+        rotation, _ = cv2.Rodrigues(self.rvec)
+        return self.camera_matrix @ np.hstack([rotation, self.tvec.reshape(3, 1)])
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'image_size': list(self.image_size),
+            'camera_matrix': self.camera_matrix.tolist(),
+            'dist_coeffs': self.dist_coeffs.tolist(),
+            'rvec': self.rvec.tolist(),
+            'tvec': self.tvec.tolist(),
+            'rms': self.rms,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data['image_size'], data['camera_matrix'], data['dist_coeffs'],
+                   data['rvec'], data['tvec'], data.get('rms', 0.0))
+
+
+class BoardDetector:
+    """Finds checkerboard or ChArUco corners and their board coordinates."""
+
+    def __init__(self, columns, rows, square_size, marker_size=None, dictionary=None):
+        self.pattern = (columns, rows)  # Inner corners for a checkerboard, squares for ChArUco
+        self.square_size = square_size
+        self.charuco = marker_size is not None
+        if self.charuco:
+            aruco_dict = cv2.aruco.getPredefinedDictionary(getattr(cv2.aruco, dictionary or Constants.CHARUCO_DICTIONARY))
+            self.board = cv2.aruco.CharucoBoard(self.pattern, square_size, marker_size, aruco_dict)
+            self.detector = cv2.aruco.CharucoDetector(self.board)
+            self.board_points = self.board.getChessboardCorners().astype(np.float32)
+        else:
+            grid = np.mgrid[0:columns, 0:rows].T.reshape(-1, 2)
+            self.board_points = np.zeros((columns * rows, 3), dtype=np.float32)
+            self.board_points[:, :2] = grid * square_size
+
+    def detect(self, frame):
+        """Return (object_points, image_points) or None when the board is not found."""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.charuco:
+            corners, ids, _, _ = self.detector.detectBoard(gray)
+            # A homography needs at least four corners, and a few more keep calibrateCamera stable
+            if ids is None or len(ids) < Constants.CHARUCO_MIN_CORNERS:
+                return None
+            return self.board_points[ids.reshape(-1)], corners.reshape(-1, 2).astype(np.float32)
+
+        found, corners = cv2.findChessboardCorners(
+            gray, self.pattern, cv2.CALIB_CB_ADAPTIVE_THRESH | cv2.CALIB_CB_NORMALIZE_IMAGE | cv2.CALIB_CB_FAST_CHECK)
+        if not found:
+            return None
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
+        corners = cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), criteria)
+        return self.board_points, corners.reshape(-1, 2)
+
+
+def detect_in_video(video_path, detector, frame_step=Constants.CALIBRATION_FRAME_STEP):
+    """Scan a saved video and return the detections and the image size."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video {video_path}")
+    detections = []
+    image_size = None
+    index = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        image_size = (frame.shape[1], frame.shape[0])
+        if index % frame_step == 0:
+            detection = detector.detect(frame)
+            if detection is not None:
+                detections.append(detection)
+        index += 1
+    cap.release()
+    return detections, image_size
+
+
+def calibrate_intrinsics(name, video_path, detector):
+    """Calibrate one camera from a video of the board moved around its field of view."""
+    detections, image_size = detect_in_video(video_path, detector)
+    if len(detections) < Constants.CALIBRATION_MIN_VIEWS:
+        raise ValueError(f"Board found in only {len(detections)} frames of {video_path}")
+    object_points = [points for points, _ in detections]
+    image_points = [corners for _, corners in detections]
+    rms, camera_matrix, dist_coeffs, _, _ = cv2.calibrateCamera(object_points, image_points, image_size, None, None)
+    print(f"Intrinsics for {name}: RMS {rms:.3f} px over {len(detections)} views")
+    return CameraCalibration(name, image_size, camera_matrix, dist_coeffs, rms=rms)
+
+
+def calibrate_extrinsics(camera, video_path, detector):
+    """Place a camera in the world frame of a static board seen by every camera."""
+    detections, _ = detect_in_video(video_path, detector)
+    if not detections:
+        raise ValueError(f"Board not found in {video_path}")
+
+    # The board does not move, so keep the view that reprojects best
+    best_error = None
+    for object_points, image_points in detections:
+        ok, rvec, tvec = cv2.solvePnP(object_points, image_points, camera.camera_matrix, camera.dist_coeffs)
+        if not ok:
+            continue
+        projected, _ = cv2.projectPoints(object_points, rvec, tvec, camera.camera_matrix, camera.dist_coeffs)
+        error = np.sqrt(np.mean(np.sum((projected.reshape(-1, 2) - image_points) ** 2, axis=1)))
+        if best_error is None or error < best_error:
+            best_error = error
+            camera.rvec = rvec.reshape(3)
+            camera.tvec = tvec.reshape(3)
+    if best_error is None:
+        raise ValueError(f"Could not solve the board pose in {video_path}")
+    print(f"Extrinsics for {camera.name}: {best_error:.3f} px")
+    return camera
+
+
+def save_calibration(path, cameras):
+    """Write the calibration of every camera to a JSON file."""
+    with open(path, 'w') as file:
+        json.dump({'cameras': [camera.to_dict() for camera in cameras]}, file, indent=2)
+
+
+def load_calibration(path):
+    """Read the cameras written by save_calibration."""
+    with open(path) as file:
+        return [CameraCalibration.from_dict(data) for data in json.load(file)['cameras']]
+
+
+def main():
+    """Calibrate the cameras of an experiment from saved videos."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--intrinsics', nargs='+', required=True,
+                        help="One video per camera with the board moved around the view")
+    parser.add_argument('--extrinsics', nargs='+', required=True,
+                        help="One video per camera, same order, with the board static and seen by every camera")
+    parser.add_argument('--board', default='9x6', help="Inner corners (checkerboard) or squares (ChArUco), COLSxROWS")
+    parser.add_argument('--square', type=float, required=True, help="Square size, sets the world unit")
+    parser.add_argument('--marker', type=float, help="ChArUco marker size, enables ChArUco detection")
+    parser.add_argument('--dictionary', default=Constants.CHARUCO_DICTIONARY)
+    parser.add_argument('-o', '--output', default='calibration.json')
+    args = parser.parse_args()
+
+    if len(args.intrinsics) != len(args.extrinsics):
+        parser.error("--intrinsics and --extrinsics need one video per camera")
+    columns, rows = (int(value) for value in args.board.lower().split('x'))
+    detector = BoardDetector(columns, rows, args.square, args.marker, args.dictionary)
+
+    cameras = []
+    for index, (intrinsics_video, extrinsics_video) in enumerate(zip(args.intrinsics, args.extrinsics)):
+        camera = calibrate_intrinsics(f"Camera {index}", intrinsics_video, detector)
+        cameras.append(calibrate_extrinsics(camera, extrinsics_video, detector))
+    save_calibration(args.output, cameras)
+    print(f"Saved calibration to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,4 +6,52 @@ TEXTURE_HEIGHT = 360
 VIDEO_CODEC = 'mp4v'
 VIDEO_FORMAT = '.mp4'
 BUFFER_SIZE = 30  # Frame buffer size
-CSV_BUFFER_SIZE = 100  # CSV data buffer size
\ No newline at end of file
+CSV_BUFFER_SIZE = 100  # CSV data buffer size
+
+# Adaptive quality
+# Quality ladder from cheapest to most expensive: (model_complexity, inference_scale, inference_stride)
+QUALITY_LEVELS = [
+    (0, 0.5, 3),
+    (0, 0.5, 2),
+    (0, 0.75, 1),
+    (0, 1.0, 1),
+    (1, 1.0, 1),
+    (2, 1.0, 1),
+]
+# The shared inference service always runs the lite model on its own crops, so only the stride applies there
+QUALITY_SHARED_LEVELS = [
+    (0, 1.0, 3),
+    (0, 1.0, 2),
+    (0, 1.0, 1),
+]
+QUALITY_EVAL_INTERVAL = 1.0  # Seconds of measurements per quality decision
+QUALITY_HYSTERESIS = 0.1  # Relative margin around the target before reacting
+QUALITY_DOWN_WINDOWS = 2  # Consecutive windows under target before stepping down
+QUALITY_UP_WINDOWS = 5  # Consecutive windows with headroom before stepping up
+QUALITY_MIN_CPU_HEADROOM = 0.2  # Free CPU fraction required to step up
+QUALITY_UP_COOLDOWN = 3.0  # Seconds between step ups across the whole experiment
+
+# Shared inference service
+INFERENCE_MODEL = 'pose_landmark_lite.tflite'
+INFERENCE_INPUT_SIZE = 256  # Square model input in pixels
+INFERENCE_LANDMARK_VALUES = 195  # 39 landmarks x (x, y, z, visibility, presence)
+INFERENCE_MIN_POSE_FLAG = 0.5  # Below this the ROI is reset to the whole frame
+INFERENCE_ROI_SCALE = 1.25  # ROI margin around the tracked landmarks
+INFERENCE_BATCH_WINDOW = 0.003  # Seconds to wait for other cameras to join a batch
+INFERENCE_POOL_SIZE = 2  # Interpreters used when the model cannot be batched
+INFERENCE_THREADS = 0  # Interpreter threads shared by the service, 0 uses every core
+
+# Calibration and triangulation
+CALIBRATION_FRAME_STEP = 10  # Check every Nth video frame for the board
+CALIBRATION_MIN_VIEWS = 10  # Board views required to calibrate intrinsics
+CHARUCO_DICTIONARY = 'DICT_5X5_100'
+CHARUCO_MIN_CORNERS = 6
+TRIANGULATION_MIN_VISIBILITY = 0.5  # Landmarks below this visibility are ignored
+TRIANGULATION_MAX_GAP = 0.15  # Longest gap in seconds between rows of a camera that is interpolated across
+TRIANGULATION_CHUNK_FRAMES = 20000  # Frames triangulated per batch
+
+# Recording review
+REVIEW_CACHE_FRAMES = 240  # Decoded frames kept for scrubbing
+REVIEW_PREFETCH_FRAMES = 60  # Frames decoded ahead of the playhead
+REVIEW_INDEX_STRIDE = 256  # CSV rows per lazily loaded landmark block
+REVIEW_LANDMARK_BLOCKS = 64  # Landmark blocks kept in memory
@@ -1,9 +1,11 @@
 class ExperimentWindow:
-    def __init__(self, chosenCamera=None, cameraIndex=None, resultFilePath=None, showPreview=True, saveVideo=True, textureWidth=1280, textureHeight=720):
+    def __init__(self, chosenCamera=None, cameraIndex=None, resultFilePath=None, showPreview=True, saveVideo=True, textureWidth=1280, textureHeight=720, targetFps=None, latencyBudgetMs=None):
         self.chosenCamera = chosenCamera
         self.cameraIndex = cameraIndex
         self.resultFilePath = resultFilePath
         self.showPreview = showPreview
         self.saveVideo = saveVideo
         self.textureWidth = textureWidth
-        self.textureHeight = textureHeight
\ No newline at end of file
+        self.textureHeight = textureHeight
+        self.targetFps = targetFps  # Adaptive quality targets, None keeps a fixed quality
+        self.latencyBudgetMs = latencyBudgetMs
\ No newline at end of file
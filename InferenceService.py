@@ -0,0 +1,312 @@
+import Constants
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import cv2
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+from PyQt6.QtCore import pyqtSignal as Signal, QThread
+
+try:
+    from tflite_runtime.interpreter import Interpreter
+except ImportError:
+    import tensorflow as tf
+    Interpreter = tf.lite.Interpreter
+
+
+def sigmoid(values):
+    return 1.0 / (1.0 + np.exp(-values))
+
+
+class CameraSlot:
+    """Latest pending frame, tracking ROI, last result and counters of one camera."""
+
+    def __init__(self):
+        self.frame = None
+        self.captured_at = None
+        self.submitted_at = None
+        self.roi = None  # (center_x, center_y, size) in pixels, None means the whole frame
+        self.result = None
+        self.served = 0
+        self.dropped = 0
+        self.wait_total = 0.0
+        self.full_frame = 0  # Frames run on the whole letterboxed frame to find the person again
+        self.total_served = 0  # Totals over the whole run, never reset by the periodic reports
+        self.total_dropped = 0
+        self.total_wait = 0.0
+        self.total_full_frame = 0
+
+
+class InferenceService(QThread):
+    """Runs the pose landmark model for every camera of an experiment in shared batches.
+
+    There is no pose detector: the person is found by running the landmark model
+    on the whole letterboxed frame, then tracked with an axis-aligned box around
+    the visible landmarks. Small or rotated subjects are tracked less accurately
+    than with MediaPipe's detector-aligned crops.
+    """
+    stats_updated = Signal(dict)
+
+    def __init__(self, model_path=None, pool_size=Constants.INFERENCE_POOL_SIZE, threads=Constants.INFERENCE_THREADS):
+        super().__init__()
+        self.model_path = model_path or os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                     Constants.INFERENCE_MODEL)
+        self.pool_size = pool_size
+        self.threads = threads
+        self.running = False
+        self.condition = threading.Condition()
+        self.slots = {}
+        self.interpreters = []
+        self.executor = None
+        self.batched = False
+        self.batch_size = 0
+        self.batches = 0
+        self.batch_latency_total = 0.0
+        self.total_batches = 0
+        self.total_batch_latency = 0.0
+
+    def register(self, camera_index):
+        """Reserve a slot for a camera."""
+        with self.condition:
+            self.slots.setdefault(camera_index, CameraSlot())
+
+    def unregister(self, camera_index):
+        """Release the slot of a camera."""
+        with self.condition:
+            self.slots.pop(camera_index, None)
+
+    def submit(self, camera_index, frame, captured_at):
+        """Queue the latest frame of a camera, replacing one that was not served yet."""
+        with self.condition:
+            slot = self.slots.get(camera_index)
+            if slot is None:
+                return
+            if slot.frame is not None:
+                slot.dropped += 1
+                slot.total_dropped += 1
+            slot.frame = frame
+            slot.captured_at = captured_at
+            slot.submitted_at = time.perf_counter()
+            self.condition.notify()
+
+    def take_result(self, camera_index):
+        """Return (results, captured_at, latency) once per new result, or None."""
+        with self.condition:
+            slot = self.slots.get(camera_index)
+            if slot is None or slot.result is None:
+                return None
+            result, slot.result = slot.result, None
+            return result
+
+    def load_interpreters(self, batch_size):
+        """Use one interpreter with a batch dimension, falling back to a pool of single-frame interpreters."""
+        threads = self.threads or os.cpu_count() or 1
+        interpreter = Interpreter(model_path=self.model_path, num_threads=threads)
+        input_index = interpreter.get_input_details()[0]['index']
+        try:
+            interpreter.resize_tensor_input(input_index, [batch_size, Constants.INFERENCE_INPUT_SIZE,
+                                                          Constants.INFERENCE_INPUT_SIZE, 3])
+            interpreter.allocate_tensors()
+            self.interpreters = [interpreter]
+            self.batched = True
+        except (RuntimeError, ValueError):
+            # The graph has a fixed batch of one, split the CPU between a small pool instead
+            pool_threads = max(1, threads // self.pool_size)
+            self.interpreters = []
+            for _ in range(self.pool_size):
+                interpreter = Interpreter(model_path=self.model_path, num_threads=pool_threads)
+                interpreter.allocate_tensors()
+                self.interpreters.append(interpreter)
+            self.executor = self.executor or ThreadPoolExecutor(max_workers=self.pool_size)
+            self.batched = False
+        self.batch_size = batch_size
+
+    def run(self):
+        """Collect the latest frame of every camera and run them as one batch."""
+        self.running = True
+        stats_time = time.perf_counter()
+        while self.running:
+            with self.condition:
+                while self.running and not any(slot.frame is not None for slot in self.slots.values()):
+                    self.condition.wait(0.1)
+                if not self.running:
+                    break
+
+            # Give the other cameras a moment to join the batch
+            time.sleep(Constants.INFERENCE_BATCH_WINDOW)
+            with self.condition:
+                pending = [(camera_index, slot, slot.frame) for camera_index, slot in self.slots.items()
+                           if slot.frame is not None]
+                for _, slot, _ in pending:
+                    slot.frame = None
+            if not pending:
+                continue
+
+            # Without a pose detector, the person is found by running the landmark model on the whole frame
+            acquiring = [slot.roi is None for _, slot, _ in pending]
+            batch_start = time.perf_counter()
+            results = self.infer([(slot, frame) for _, slot, frame in pending])
+            finished = time.perf_counter()
+
+            with self.condition:
+                self.batches += 1
+                self.total_batches += 1
+                self.batch_latency_total += finished - batch_start
+                self.total_batch_latency += finished - batch_start
+                for (camera_index, slot, frame), result, full_frame in zip(pending, results, acquiring):
+                    latency = finished - slot.submitted_at
+                    slot.full_frame += full_frame
+                    slot.total_full_frame += full_frame
+                    slot.served += 1
+                    slot.total_served += 1
+                    slot.wait_total += latency
+                    slot.total_wait += latency
+                    slot.result = (result, slot.captured_at, latency)
+
+            if finished - stats_time >= 1.0:
+                self.stats_updated.emit(self.collect_stats())
+                stats_time = finished
+
+        if self.executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def infer(self, items):
+        """Run the model on (slot, frame) pairs and return Holistic-like results in the same order."""
+        inputs = []
+        transforms = []
+        for slot, frame in items:
+            tensor, transform = self.crop_roi(frame, slot.roi)
+            inputs.append(tensor)
+            transforms.append(transform)
+        outputs = self.invoke(np.stack(inputs))
+        return [self.decode(raw_landmarks, pose_flag, transform, frame.shape, slot)
+                for (slot, frame), transform, (raw_landmarks, pose_flag) in zip(items, transforms, outputs)]
+
+    def crop_roi(self, frame, roi):
+        """Warp the camera ROI into the square model input, padding outside the frame."""
+        height, width = frame.shape[:2]
+        if roi is None:
+            roi = (width / 2, height / 2, max(width, height))
+        center_x, center_y, size = roi
+        scale = Constants.INFERENCE_INPUT_SIZE / size
+        transform = np.array([
+            [scale, 0, Constants.INFERENCE_INPUT_SIZE / 2 - center_x * scale],
+            [0, scale, Constants.INFERENCE_INPUT_SIZE / 2 - center_y * scale],
+        ], dtype=np.float32)
+        crop = cv2.warpAffine(frame, transform, (Constants.INFERENCE_INPUT_SIZE, Constants.INFERENCE_INPUT_SIZE),
+                              borderMode=cv2.BORDER_CONSTANT)
+        tensor = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
+        return tensor, (center_x - size / 2, center_y - size / 2, size)
+
+    def invoke(self, batch):
+        """Run the model and return (landmarks, pose_flag) per input."""
+        # Size the batch for every registered camera so late cameras do not force a reallocation
+        capacity = max(len(self.slots), len(batch))
+        if not self.interpreters or (self.batched and self.batch_size != capacity):
+            self.load_interpreters(capacity)
+        if self.batched:
+            padded = np.zeros((self.batch_size,) + batch.shape[1:], dtype=np.float32)
+            padded[:len(batch)] = batch
+            return self.invoke_one(self.interpreters[0], padded)[:len(batch)]
+
+        # Interpreters release the GIL while invoking, each one runs its share of frames in turn
+        def invoke_share(index):
+            interpreter = self.interpreters[index]
+            return [self.invoke_one(interpreter, batch[i:i + 1])[0]
+                    for i in range(index, len(batch), len(self.interpreters))]
+
+        shares = list(self.executor.map(invoke_share, range(len(self.interpreters))))
+        return [shares[i % len(self.interpreters)][i // len(self.interpreters)] for i in range(len(batch))]
+
+    def invoke_one(self, interpreter, batch):
+        interpreter.set_tensor(interpreter.get_input_details()[0]['index'], batch)
+        interpreter.invoke()
+        landmarks = pose_flag = None
+        for output in interpreter.get_output_details():
+            shape = output['shape']
+            if shape[-1] == Constants.INFERENCE_LANDMARK_VALUES and len(shape) == 2:
+                landmarks = interpreter.get_tensor(output['index'])
+            elif len(shape) == 2 and shape[-1] == 1:
+                pose_flag = interpreter.get_tensor(output['index'])
+        return list(zip(landmarks, pose_flag[:, 0]))
+
+    def decode(self, raw_landmarks, pose_flag, transform, frame_shape, slot):
+        """Map model landmarks back to the frame and update the tracking ROI."""
+        height, width = frame_shape[:2]
+        left, top, size = transform
+        values = raw_landmarks.reshape(-1, 5)[:33]
+        scale = size / Constants.INFERENCE_INPUT_SIZE
+        x = (left + values[:, 0] * scale) / width
+        y = (top + values[:, 1] * scale) / height
+        z = values[:, 2] * scale / width
+        visibility = sigmoid(values[:, 3])
+
+        if pose_flag < Constants.INFERENCE_MIN_POSE_FLAG:
+            slot.roi = None
+            return SimpleNamespace(pose_landmarks=None, left_hand_landmarks=None, right_hand_landmarks=None)
+
+        # Track the person with a square box around the visible landmarks
+        visible = visibility > 0.5
+        if visible.any():
+            min_x, max_x = x[visible].min() * width, x[visible].max() * width
+            min_y, max_y = y[visible].min() * height, y[visible].max() * height
+            slot.roi = ((min_x + max_x) / 2, (min_y + max_y) / 2,
+                        max(max_x - min_x, max_y - min_y, 1.0) * Constants.INFERENCE_ROI_SCALE)
+        else:
+            slot.roi = None
+
+        pose_landmarks = landmark_pb2.NormalizedLandmarkList()
+        for i in range(len(values)):
+            pose_landmarks.landmark.add(x=float(x[i]), y=float(y[i]), z=float(z[i]), visibility=float(visibility[i]))
+        return SimpleNamespace(pose_landmarks=pose_landmarks, left_hand_landmarks=None, right_hand_landmarks=None)
+
+    def collect_stats(self, cumulative=False):
+        """Report per-batch latency and per-camera fairness.
+
+        By default this covers the time since the last report and starts a new
+        window; with cumulative=True it covers the whole run and resets nothing.
+        """
+        with self.condition:
+            cameras = {}
+            served = []
+            for camera_index, slot in self.slots.items():
+                if cumulative:
+                    camera_served, camera_dropped, camera_wait = slot.total_served, slot.total_dropped, slot.total_wait
+                    camera_full_frame = slot.total_full_frame
+                else:
+                    camera_served, camera_dropped, camera_wait = slot.served, slot.dropped, slot.wait_total
+                    camera_full_frame = slot.full_frame
+                    slot.served = slot.dropped = slot.full_frame = 0
+                    slot.wait_total = 0.0
+                cameras[camera_index] = {
+                    'served': camera_served,
+                    'dropped': camera_dropped,
+                    'full_frame': camera_full_frame,
+                    'wait_ms': round(camera_wait / camera_served * 1000.0, 2) if camera_served else 0.0,
+                }
+                served.append(camera_served)
+            if cumulative:
+                batches, batch_latency = self.total_batches, self.total_batch_latency
+            else:
+                batches, batch_latency = self.batches, self.batch_latency_total
+                self.batches = 0
+                self.batch_latency_total = 0.0
+        # Jain's fairness index over frames served, 1.0 when every camera is served equally
+        fairness = sum(served) ** 2 / (len(served) * sum(s * s for s in served)) if any(served) else 1.0
+        return {
+            'mode': 'batch' if self.batched else f'pool x{len(self.interpreters)}',
+            'batches': batches,
+            'batch_ms': round(batch_latency / batches * 1000.0, 2) if batches else 0.0,
+            'fairness': round(fairness, 3),
+            'cameras': cameras,
+        }
+
+    def stop(self):
+        """Stop the inference service."""
+        self.running = False
+        with self.condition:
+            self.condition.notify_all()
+        self.wait()
@@ -1,6 +1,9 @@
 from MotionCaptureWindow import MotionCaptureWindow
 from ExperimentWindow import ExperimentWindow
 from WorkerThread import WorkerThread
+from QualityController import QualityCoordinator
+from InferenceService import InferenceService
+from ReviewWindow import ReviewWindow, choose_recording
 
 import Constants
 import cv2
@@ -101,6 +104,23 @@ class MainWindow(QMainWindow):
         self.saveVideo_cb.setChecked(True)
         checkbox_layout.addWidget(self.saveVideo_cb)  
         addWindow_layout.addLayout(checkbox_layout) 
+
+        quality_layout = QHBoxLayout()
+        quality_layout.setContentsMargins(2, 2, 2, 2)
+        quality_layout.setSpacing(1)
+        quality_layout.addWidget(QLabel("Target FPS:"))
+        self.targetFps_spinbox = QSpinBox()
+        self.targetFps_spinbox.setFixedHeight(20)
+        self.targetFps_spinbox.setRange(0, Constants.CAPTURE_FPS)
+        self.targetFps_spinbox.setSpecialValueText("Off")
+        quality_layout.addWidget(self.targetFps_spinbox)
+        quality_layout.addWidget(QLabel("Latency budget (ms):"))
+        self.latencyBudget_spinbox = QSpinBox()
+        self.latencyBudget_spinbox.setFixedHeight(20)
+        self.latencyBudget_spinbox.setRange(0, 1000)
+        self.latencyBudget_spinbox.setSpecialValueText("Off")
+        quality_layout.addWidget(self.latencyBudget_spinbox)
+        addWindow_layout.addLayout(quality_layout)
         
         self.add_window_btn = QPushButton("Add Window")
         self.add_window_btn.setFixedHeight(20)
@@ -134,25 +154,51 @@ class MainWindow(QMainWindow):
         experimentButtons_layout.addWidget(self.start_btn)
         experimentButtons_layout.addWidget(self.stop_btn)
         experimentButtons_layout.addWidget(self.close_btn)
+        self.sharedInference_cb = QCheckBox("Shared Inference")
+        self.sharedInference_cb.setToolTip(
+            "Run the pose landmark model for all cameras in shared batches.\n"
+            "Faster, but without the pose detector: the person is searched on the whole frame and\n"
+            "tracked with an unrotated box, so small or rotated subjects get less accurate landmarks.\n"
+            "Run Benchmark.py to measure the difference on your recordings.")
+        experimentButtons_layout.addWidget(self.sharedInference_cb)
 
         experimentResources_layout.addLayout(experimentButtons_layout)
         experimentResources_group.setLayout(experimentResources_layout)
 
+        # Review group
+        review_group = QGroupBox("Review")
+        review_layout = QVBoxLayout()
+        review_layout.setContentsMargins(2, 2, 2, 2)
+        review_layout.setSpacing(1)
+        self.review_btn = QPushButton("Review Recording")
+        self.review_btn.setFixedHeight(20)
+        review_layout.addWidget(self.review_btn)
+        review_group.setLayout(review_layout)
+
         # # Add groups to control panel
         control_layout.addWidget(addWindow_group)
         control_layout.addWidget(experimentResources_group)
+        control_layout.addWidget(review_group)
         main_layout.addWidget(control_panel)
 
+        # Status bar
+        self.statusBar = QStatusBar()
+        self.statusBar.setFixedHeight(20)
+        self.setStatusBar(self.statusBar)
+
         # Initialize variables
         self.filename = None
         self.csv_file = None
         self.csv_writer = None
         self.video_writer = None
         self.currentExperimentList = None
+        self.quality_coordinator = None
+        self.inference_service = None
         
         # Criação de threads para abrir janelas
         self.threads = []
         self.windows = []  # List to keep track of opened windows
+        self.review_windows = []
 
         # # Connect signals
         self.select_file_btn.clicked.connect(self.select_file)
@@ -162,6 +208,7 @@ class MainWindow(QMainWindow):
         self.stop_btn.clicked.connect(self.stop_experiment)
         self.close_btn.clicked.connect(self.close_experiment)
         self.refresh_cameras_btn.clicked.connect(self.refresh_cameras)
+        self.review_btn.clicked.connect(self.open_review)
         self.camera_combo.currentIndexChanged.connect(self.generate_filename)  
 
         # Initial UI state
@@ -199,7 +246,9 @@ class MainWindow(QMainWindow):
                                             self.showPreview_cb.isChecked(),
                                             self.saveVideo_cb.isChecked(),
                                             textureWidth,
-                                            textureHeight)
+                                            textureHeight,
+                                            self.targetFps_spinbox.value() or None,
+                                            self.latencyBudget_spinbox.value() or None)
 
         isExperimentValid = self.CheckExperimentWindow(experimentWindow)
         if not isExperimentValid:
@@ -241,12 +290,19 @@ class MainWindow(QMainWindow):
                               
         # Função para criar uma janela
         def create_window(experiment):
-            window = MotionCaptureWindow(experiment)
+            window = MotionCaptureWindow(experiment, self.quality_coordinator, self.inference_service)
             window.show()
             self.windows.append(window)  # Armazena a referência para evitar garbage collection
 
         
         if self.currentExperimentList is not None:
+            # Shared across cameras so adaptive quality reacts to the whole experiment load
+            self.quality_coordinator = QualityCoordinator()
+            if self.sharedInference_cb.isChecked():
+                self.inference_service = InferenceService()
+                self.inference_service.stats_updated.connect(self.update_inference_stats)
+                self.inference_service.start()
+            self.sharedInference_cb.setEnabled(False)
             for experiment in self.currentExperimentList: 
                 thread = WorkerThread(experiment)
                 thread.create_window_signal.connect(create_window)
@@ -287,8 +343,14 @@ class MainWindow(QMainWindow):
             window.close()
         self.windows.clear()
 
+        if self.inference_service:
+            self.inference_service.stop()
+            self.inference_service = None
+        self.sharedInference_cb.setEnabled(True)
+
         # Clear the current experiment list
         self.currentExperimentList = None
+        self.quality_coordinator = None
 
         # Remove all widgets (experiment labels) from experimentResources_layout
         experimentResources_layout = self.open_experiment_btn.parentWidget().layout()
@@ -304,6 +366,27 @@ class MainWindow(QMainWindow):
         self.close_btn.setEnabled(False)
         self.open_experiment_btn.setEnabled(False)
 
+    def open_review(self):
+        """Open a review window for a saved recording."""
+        filename = choose_recording(self)
+        if not filename:
+            return
+        window = ReviewWindow()
+        window.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.review_windows.append(window)  # Keep a reference to avoid garbage collection
+        window.destroyed.connect(lambda: self.review_windows.remove(window))
+        if not window.open_recording(filename):
+            window.close()
+
+    @Slot(dict)
+    def update_inference_stats(self, stats):
+        """Show shared inference batch latency and per-camera fairness."""
+        cameras = ", ".join(f"Camera {index}: {camera['served']} served, {camera['dropped']} dropped, "
+                            f"{camera['full_frame']} searches, {camera['wait_ms']} ms"
+                            for index, camera in stats['cameras'].items())
+        self.statusBar.showMessage(f"Inference ({stats['mode']}): {stats['batches']} batches, "
+                                   f"{stats['batch_ms']} ms/batch, fairness {stats['fairness']} | {cameras}")
+
     def refresh_cameras(self):
         """Refresh the list of available cameras."""
         current_camera = self.camera_combo.currentIndex()
@@ -17,7 +17,7 @@ from datetime import datetime
 class MotionCaptureWindow(QMainWindow):
     """Main application window for motion capture."""
 
-    def __init__(self, experiment):
+    def __init__(self, experiment, quality_coordinator=None, inference_service=None):
         super().__init__()
 
         self.experiment = experiment
@@ -65,12 +65,22 @@ class MotionCaptureWindow(QMainWindow):
         self.csv_file = None
         self.csv_writer = None
         self.video_writer = None
+        self.quality_file = None
+        self.quality_writer = None
+        self.frames_file = None
+        self.frames_writer = None
+        self.frames_written = 0
 
         # Create video thread
         self.thread = VideoThread()
         self.thread.frame_ready.connect(self.update_frame)
         self.thread.fps_updated.connect(self.update_fps)
         self.thread.landmarks_ready.connect(self.save_landmarks)
+        self.thread.quality_changed.connect(self.save_quality_change)
+        self.thread.set_quality_target(self.experiment.targetFps,
+                                       self.experiment.latencyBudgetMs,
+                                       quality_coordinator)
+        self.thread.set_inference_service(inference_service)
 
         self.thread.camera_index = self.experiment.cameraIndex
 
@@ -104,6 +114,15 @@ class MotionCaptureWindow(QMainWindow):
             print(f"Write in csv file for {self.experiment.chosenCamera}")
             self.csv_writer.writerow(headers)
 
+            # Log quality level changes next to the landmarks so each segment can be traced
+            if self.experiment.targetFps or self.experiment.latencyBudgetMs:
+                quality_path = self.filename.replace('.csv', '_quality.csv')
+                self.quality_file = open(quality_path, mode='w', newline='')
+                self.quality_writer = csv.writer(self.quality_file, delimiter=';')
+                self.quality_writer.writerow(['timestamp', 'level', 'model_complexity', 'inference_scale',
+                                              'inference_stride', 'fps', 'latency_ms', 'frame_cost_ms',
+                                              'cpu_headroom', 'reason'])
+
             # Initialize video writer if needed
             if self.experiment.saveVideo:
                 video_path = self.filename.replace('.csv', Constants.VIDEO_FORMAT)
@@ -114,6 +133,12 @@ class MotionCaptureWindow(QMainWindow):
                     25,    #float(self.fps_spinbox.value()),
                     (self.experiment.textureWidth, self.experiment.textureHeight)
                 )
+
+                # The video rate is fixed, so keep the capture time of every written frame
+                self.frames_file = open(self.filename.replace('.csv', '_frames.csv'), mode='w', newline='')
+                self.frames_writer = csv.writer(self.frames_file, delimiter=';')
+                self.frames_writer.writerow(['frame', 'timestamp'])
+                self.frames_written = 0
             
             # Reset the first timestamp
             self.first_timestamp = None
@@ -139,6 +164,10 @@ class MotionCaptureWindow(QMainWindow):
         except TypeError:
             # O sinal já pode estar desconectado
             pass
+        try:
+            self.thread.quality_changed.disconnect(self.save_quality_change)
+        except TypeError:
+            pass
 
         # Close files
         if self.csv_file:
@@ -147,21 +176,35 @@ class MotionCaptureWindow(QMainWindow):
             self.csv_file = None
             self.csv_writer = None
 
+        if self.quality_file:
+            print(f"Close quality log for {self.experiment.chosenCamera}")
+            self.quality_file.close()
+            self.quality_file = None
+            self.quality_writer = None
+
         if self.video_writer:
             print(f"Releasing video writer for {self.experiment.chosenCamera}")
             self.video_writer.release()
             self.video_writer = None
 
+        if self.frames_file:
+            self.frames_file.close()
+            self.frames_file = None
+            self.frames_writer = None
+
         # Update UI
         self.statusBar.showMessage("Capture finished", 3000)
 
-    @Slot(np.ndarray)
-    def update_frame(self, frame):
+    @Slot(np.ndarray, np.ndarray, float)
+    def update_frame(self, display_frame, frame, captured_at):
         """Update the video display."""
         if self.video_writer:
+            # Record the frame without landmarks, the review window draws them from the CSV
             self.video_writer.write(frame)
+            self.frames_writer.writerow([self.frames_written, datetime.fromtimestamp(captured_at)])
+            self.frames_written += 1
 
-        rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        rgb_image = cv2.cvtColor(display_frame, cv2.COLOR_BGR2RGB)
         h, w, ch = rgb_image.shape
         bytes_per_line = ch * w
         qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
@@ -177,11 +220,23 @@ class MotionCaptureWindow(QMainWindow):
     def save_landmarks(self, landmarks):
         """Save landmarks to CSV file."""
         if self.csv_writer:
-            landmarks[0] = datetime.now()
+            # Keep the capture time from VideoThread so recordings of several cameras line up
+            landmarks[0] = datetime.fromtimestamp(landmarks[0])
 
             print(f"Writing into csv for  {self.experiment.chosenCamera}")
             self.csv_writer.writerow(landmarks)
 
+    @Slot(dict)
+    def save_quality_change(self, change):
+        """Save a quality level change to the quality log."""
+        if self.quality_writer:
+            print(f"Quality {change['reason']} to level {change['level']} for {self.experiment.chosenCamera}")
+            self.quality_writer.writerow([datetime.fromtimestamp(change['timestamp']), change['level'], change['model_complexity'],
+                                          change['inference_scale'], change['inference_stride'],
+                                          change['fps'], change['latency_ms'], change['frame_cost_ms'],
+                                          change['cpu_headroom'], change['reason']])
+            self.quality_file.flush()
+
     def closeEvent(self, event):
         """Handle window close event."""
         
@@ -0,0 +1,219 @@
+import Constants
+import threading
+import time
+import psutil
+
+
+class QualityCoordinator:
+    """Shares CPU headroom and step-up decisions between all cameras of an experiment."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.controllers = []
+        self.cpu_headroom = 1.0
+        self.last_step_up = 0.0
+        self._last_sample = time.perf_counter()
+        psutil.cpu_percent(interval=None)  # Start the system-wide measurement window
+
+    def register(self, controller):
+        """Add a camera controller to the experiment."""
+        with self.lock:
+            self.controllers.append(controller)
+
+    def unregister(self, controller):
+        """Remove a camera controller from the experiment."""
+        with self.lock:
+            if controller in self.controllers:
+                self.controllers.remove(controller)
+
+    def sample_cpu_headroom(self):
+        """Return the free CPU fraction of the whole system, so load from other processes counts too."""
+        with self.lock:
+            now = time.perf_counter()
+            # Avoid noisy samples when several cameras ask at the same time
+            if now - self._last_sample >= Constants.QUALITY_EVAL_INTERVAL / 2:
+                usage = psutil.cpu_percent(interval=None) / 100.0
+                self.cpu_headroom = min(max(1.0 - usage, 0.0), 1.0)
+                self._last_sample = now
+            return self.cpu_headroom
+
+    def allow_step_up(self, controller):
+        """Let a single camera at a time step up, cheapest camera first."""
+        with self.lock:
+            now = time.perf_counter()
+            if now - self.last_step_up < Constants.QUALITY_UP_COOLDOWN:
+                return False
+            if self.cpu_headroom < Constants.QUALITY_MIN_CPU_HEADROOM:
+                return False
+            waiting = [c for c in self.controllers if c.wants_step_up]
+            if waiting and min(waiting, key=lambda c: c.level) is not controller:
+                return False
+            self.last_step_up = now
+            return True
+
+    def pick_step_down(self, controller):
+        """When the CPU is saturated, the most expensive camera steps down first."""
+        with self.lock:
+            if self.cpu_headroom >= Constants.QUALITY_MIN_CPU_HEADROOM:
+                return True
+            struggling = [c for c in self.controllers if c.wants_step_down]
+            if not struggling:
+                return True
+            return max(struggling, key=lambda c: c.level) is controller
+
+
+class QualityController:
+    """Steps model complexity, inference resolution and stride to hold a target FPS or latency budget."""
+
+    def __init__(self, target_fps=None, latency_budget_ms=None, model_complexity=0, coordinator=None, capture_fps=None,
+                 levels=Constants.QUALITY_LEVELS):
+        self.levels = levels
+        self.target_fps = target_fps
+        self.capture_fps = capture_fps or None  # Nominal camera rate, replaced by the measured one
+        self.latency_budget = latency_budget_ms / 1000.0 if latency_budget_ms else None
+        self.coordinator = coordinator or QualityCoordinator()
+        self.coordinator.register(self)
+
+        # Start at full resolution with the requested complexity
+        self.level = self.levels.index((model_complexity, 1.0, 1))
+        self.wants_step_up = False
+        self.wants_step_down = False
+        self.down_windows = 0
+        self.up_windows = 0
+        self.fps = 0.0
+        self.latency_ms = 0.0
+        self.frame_cost_ms = 0.0
+        self.level_costs = {}  # Level -> (frame cost, inference latency) of the last window spent there
+        self.step_up_ratios = {}  # Level -> measured (cost, latency) ratio against the level below
+        self._reset_window()
+
+    @property
+    def enabled(self):
+        return self.target_fps is not None or self.latency_budget is not None
+
+    @property
+    def model_complexity(self):
+        return self.levels[self.level][0]
+
+    @property
+    def inference_scale(self):
+        return self.levels[self.level][1]
+
+    @property
+    def inference_stride(self):
+        return self.levels[self.level][2]
+
+    def _reset_window(self):
+        self.window_start = time.perf_counter()
+        self.window_frames = 0
+        self.window_cost = 0.0
+        self.window_latency = 0.0
+        self.window_inferences = 0
+
+    def update(self, frame_cost, inference_latency=None, frames=1):
+        """Record one processed frame and return a change record when the quality level moves.
+
+        frame_cost is the time spent processing the frame after it was read,
+        so it does not include waiting for the camera. frames is the number of
+        camera frames the call stands for, a result covering a whole stride
+        counts as that many.
+        """
+        self.window_frames += frames
+        self.window_cost += frame_cost
+        if inference_latency is not None:
+            self.window_latency += inference_latency
+            self.window_inferences += 1
+
+        elapsed = time.perf_counter() - self.window_start
+        if elapsed < Constants.QUALITY_EVAL_INTERVAL or not self.enabled:
+            return None
+
+        self.fps = self.window_frames / elapsed
+        latency = self.window_latency / self.window_inferences if self.window_inferences else 0.0
+        self.latency_ms = latency * 1000.0
+        cost = self.window_cost / self.window_frames
+        self.frame_cost_ms = cost * 1000.0
+        self._reset_window()
+
+        margin = Constants.QUALITY_HYSTERESIS
+        self.level_costs[self.level] = (cost, latency)
+        predicted_cost, predicted_latency = self._predict_step_up(cost, latency)
+        # The loop is paced by the camera, so delivered FPS never exceeds the capture rate.
+        # When processing leaves idle time the loop is camera-bound and the FPS is the capture rate.
+        if cost < (1 - margin) / self.fps:
+            self.capture_fps = self.fps
+        too_slow = False
+        has_headroom = True
+        if self.target_fps is not None:
+            target_fps = min(self.target_fps, self.capture_fps) if self.capture_fps else self.target_fps
+            frame_budget = 1.0 / target_fps
+            too_slow |= self.fps < target_fps * (1 - margin) and cost > frame_budget * (1 - margin)
+            has_headroom &= predicted_cost <= frame_budget * (1 - margin)
+        if self.latency_budget is not None:
+            too_slow |= latency > self.latency_budget
+            has_headroom &= predicted_latency <= self.latency_budget * (1 - margin)
+
+        cpu_headroom = self.coordinator.sample_cpu_headroom()
+        if too_slow:
+            self.down_windows += 1
+            self.up_windows = 0
+        elif has_headroom and cpu_headroom >= Constants.QUALITY_MIN_CPU_HEADROOM:
+            self.up_windows += 1
+            self.down_windows = 0
+        else:
+            self.down_windows = 0
+            self.up_windows = 0
+
+        self.wants_step_down = self.down_windows >= Constants.QUALITY_DOWN_WINDOWS and self.level > 0
+        self.wants_step_up = (self.up_windows >= Constants.QUALITY_UP_WINDOWS
+                              and self.level < len(self.levels) - 1)
+
+        if self.wants_step_down and self.coordinator.pick_step_down(self):
+            # Remember how much more this level costs, so it is only tried again once the load allows it
+            below = self.level_costs.get(self.level - 1)
+            if below is not None and below[0] > 0:
+                self.step_up_ratios[self.level] = (cost / below[0], latency / below[1] if below[1] else 1.0)
+            return self._set_level(self.level - 1, "down", cpu_headroom)
+        if self.wants_step_up and self.coordinator.allow_step_up(self):
+            return self._set_level(self.level + 1, "up", cpu_headroom)
+        return None
+
+    def _predict_step_up(self, cost, latency):
+        """Predict the frame cost and inference latency of the next level from the current window."""
+        if self.level >= len(self.levels) - 1:
+            return cost, latency
+        ratios = self.step_up_ratios.get(self.level + 1)
+        if ratios is not None:
+            # The next level was measured before, scale it by the current load
+            return cost * ratios[0], latency * ratios[1]
+        # Otherwise only the stride is known to change the inference share of the frame
+        next_stride = self.levels[self.level + 1][2]
+        return cost - latency / self.inference_stride + latency / next_stride, latency
+
+    def _set_level(self, level, reason, cpu_headroom):
+        self.level = level
+        self.down_windows = 0
+        self.up_windows = 0
+        self.wants_step_down = False
+        self.wants_step_up = False
+        return self.describe(reason, cpu_headroom)
+
+    def describe(self, reason, cpu_headroom=None):
+        """Return the current quality level as a loggable record."""
+        if cpu_headroom is None:
+            cpu_headroom = self.coordinator.cpu_headroom
+        return {
+            'level': self.level,
+            'model_complexity': self.model_complexity,
+            'inference_scale': self.inference_scale,
+            'inference_stride': self.inference_stride,
+            'fps': round(self.fps, 2),
+            'latency_ms': round(self.latency_ms, 2),
+            'frame_cost_ms': round(self.frame_cost_ms, 2),
+            'cpu_headroom': round(cpu_headroom, 3),
+            'reason': reason,
+        }
+
+    def close(self):
+        """Detach from the experiment coordinator."""
+        self.coordinator.unregister(self)
@@ -0,0 +1,421 @@
+import Constants
+import bisect
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+import cv2
+import mediapipe as mp
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+from PyQt6.QtWidgets import (
+    QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
+    QSlider, QStatusBar, QFileDialog, QMessageBox
+)
+from PyQt6.QtCore import Qt, QThread, QTimer
+from PyQt6.QtGui import QImage, QPixmap
+
+
+def parse_timestamp(value):
+    """Convert a CSV timestamp written by MotionCaptureWindow to seconds."""
+    return datetime.fromisoformat(value.decode() if isinstance(value, bytes) else value).timestamp()
+
+
+def load_frame_times(path):
+    """Read the capture time of every video frame from a _frames.csv sidecar, or None for old recordings."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as file:
+        file.readline()
+        return np.array([parse_timestamp(line.rstrip().split(b';')[1]) for line in file if line.strip()])
+
+
+def choose_recording(parent):
+    """Ask for the CSV of a recording, the video is found next to it. Returns None when cancelled."""
+    documents_path = os.path.join(os.path.expanduser("~"), "Documents")
+    filename, _ = QFileDialog.getOpenFileName(parent, "Open Recording", documents_path, "CSV Files (*.csv)")
+    return filename or None
+
+
+class FrameCache:
+    """Thread-safe LRU cache of decoded video frames by index."""
+
+    def __init__(self, capacity=Constants.REVIEW_CACHE_FRAMES):
+        self.capacity = capacity
+        self.frames = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, index):
+        with self.lock:
+            return index in self.frames
+
+    def __len__(self):
+        return len(self.frames)
+
+    def get(self, index):
+        """Return a cached frame and mark it as recently used, or None."""
+        with self.lock:
+            frame = self.frames.get(index)
+            if frame is None:
+                self.misses += 1
+                return None
+            self.frames.move_to_end(index)
+            self.hits += 1
+            return frame
+
+    def put(self, index, frame):
+        """Store a frame, evicting the least recently used ones."""
+        with self.lock:
+            self.frames[index] = frame
+            self.frames.move_to_end(index)
+            while len(self.frames) > self.capacity:
+                self.frames.popitem(last=False)
+
+
+class PrefetchThread(QThread):
+    """Decodes the frames ahead of the playhead into the frame cache."""
+
+    def __init__(self, video_path, cache, frame_count):
+        super().__init__()
+        self.video_path = video_path
+        self.cache = cache
+        self.frame_count = frame_count
+        self.playhead = 0
+        self.running = False
+        self.condition = threading.Condition()
+
+    def set_playhead(self, index):
+        """Move the prefetch window to a new frame."""
+        with self.condition:
+            self.playhead = index
+            self.condition.notify()
+
+    def next_missing(self):
+        end = min(self.playhead + Constants.REVIEW_PREFETCH_FRAMES, self.frame_count)
+        for index in range(self.playhead, end):
+            if index not in self.cache:
+                return index
+        return None
+
+    def run(self):
+        """Decode sequentially and only seek when the playhead jumps."""
+        cap = cv2.VideoCapture(self.video_path)
+        position = 0  # Index of the frame the next read returns
+        self.running = True
+        while self.running:
+            with self.condition:
+                target = self.next_missing()
+                if target is None:
+                    self.condition.wait(0.1)
+                    continue
+
+            if target != position:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                position = target
+            ret, frame = cap.read()
+            if not ret:
+                # Frame count from the container can overshoot, stop prefetching past the real end
+                self.frame_count = position
+                continue
+            self.cache.put(position, frame)
+            position += 1
+        cap.release()
+
+    def stop(self):
+        """Stop the prefetch thread."""
+        self.running = False
+        with self.condition:
+            self.condition.notify()
+        self.wait()
+
+
+class LandmarkIndex:
+    """Sparse index over a landmark CSV that parses rows lazily by time range."""
+
+    def __init__(self, path, stride=Constants.REVIEW_INDEX_STRIDE):
+        self.file = open(path, 'rb')
+        self.stride = stride
+        self.blocks = OrderedDict()
+
+        # Only the first timestamp of every block is parsed here
+        self.offsets = []
+        self.times = []
+        offset = len(self.file.readline())
+        last_line = None
+        for line_number, line in enumerate(self.file):
+            if line_number % stride == 0:
+                self.offsets.append(offset)
+                self.times.append(parse_timestamp(line.split(b';', 1)[0]))
+            offset += len(line)
+            last_line = line
+        self.end_offset = offset
+        self.start_time = self.times[0] if self.times else 0.0
+        self.end_time = parse_timestamp(last_line.split(b';', 1)[0]) if last_line else 0.0
+
+    def load_block(self, block):
+        """Parse one block of rows into (timestamps, landmarks (n, 33, 4)), keeping recent blocks."""
+        if block in self.blocks:
+            self.blocks.move_to_end(block)
+            return self.blocks[block]
+        end = self.offsets[block + 1] if block + 1 < len(self.offsets) else self.end_offset
+        self.file.seek(self.offsets[block])
+        lines = self.file.read(end - self.offsets[block]).splitlines()
+        timestamps = np.array([parse_timestamp(line.split(b';', 1)[0]) for line in lines])
+        landmarks = np.array([line.split(b';')[1:] for line in lines], dtype=np.float64).reshape(len(lines), 33, 4)
+        self.blocks[block] = (timestamps, landmarks)
+        while len(self.blocks) > Constants.REVIEW_LANDMARK_BLOCKS:
+            self.blocks.popitem(last=False)
+        return self.blocks[block]
+
+    def rows_between(self, start, end):
+        """Return the rows with start <= timestamp <= end."""
+        if not self.offsets:
+            return np.empty(0), np.empty((0, 33, 4))
+        first = max(bisect.bisect_right(self.times, start) - 1, 0)
+        last = max(bisect.bisect_right(self.times, end) - 1, 0)
+        blocks = [self.load_block(block) for block in range(first, last + 1)]
+        timestamps = np.concatenate([timestamps for timestamps, _ in blocks])
+        landmarks = np.concatenate([landmarks for _, landmarks in blocks])
+        selected = (timestamps >= start) & (timestamps <= end)
+        return timestamps[selected], landmarks[selected]
+
+    def landmarks_before(self, timestamp, max_age):
+        """Return the latest landmarks (33, 4) captured at or before a timestamp, or None if older than max_age."""
+        timestamps, landmarks = self.rows_between(timestamp - max_age, timestamp)
+        if len(timestamps) == 0:
+            return None
+        return landmarks[np.argmax(timestamps)]
+
+    def landmarks_at(self, timestamp, tolerance):
+        """Return the landmarks (33, 4) closest to a timestamp, or None when no row is close enough."""
+        timestamps, landmarks = self.rows_between(timestamp - tolerance, timestamp + tolerance)
+        if len(timestamps) == 0:
+            return None
+        return landmarks[np.argmin(np.abs(timestamps - timestamp))]
+
+    def close(self):
+        self.file.close()
+
+
+class ReviewWindow(QMainWindow):
+    """Plays back a recording with its landmarks drawn over the video."""
+
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Recording Review")
+        self.mp_holistic = mp.solutions.holistic
+        self.mp_drawing = mp.solutions.drawing_utils
+        self.drawing_spec = self.mp_drawing.DrawingSpec(thickness=2, circle_radius=1)
+
+        # Create main widget and layout
+        main_widget = QWidget()
+        self.setCentralWidget(main_widget)
+        main_layout = QVBoxLayout(main_widget)
+        main_layout.setContentsMargins(5, 0, 5, 0)
+        main_layout.setSpacing(1)
+
+        self.video_label = QLabel()
+        self.video_label.setFixedSize(Constants.TEXTURE_WIDTH, Constants.TEXTURE_HEIGHT)
+        self.video_label.setStyleSheet("QLabel { background-color: black; }")
+        main_layout.addWidget(self.video_label, alignment=Qt.AlignmentFlag.AlignCenter)
+
+        self.timeline_slider = QSlider(Qt.Orientation.Horizontal)
+        self.timeline_slider.setEnabled(False)
+        main_layout.addWidget(self.timeline_slider)
+
+        # Control panel
+        control_layout = QHBoxLayout()
+        control_layout.setSpacing(2)
+        self.open_btn = QPushButton("Open Recording")
+        self.open_btn.setFixedHeight(20)
+        self.play_btn = QPushButton("Play")
+        self.play_btn.setFixedHeight(20)
+        self.play_btn.setEnabled(False)
+        self.frame_label = QLabel("No recording")
+        control_layout.addWidget(self.open_btn)
+        control_layout.addWidget(self.play_btn)
+        control_layout.addWidget(self.frame_label)
+        main_layout.addLayout(control_layout)
+
+        # Status bar
+        self.statusBar = QStatusBar()
+        self.statusBar.setFixedHeight(20)
+        self.setStatusBar(self.statusBar)
+
+        # Initialize variables
+        self.cache = None
+        self.prefetch_thread = None
+        self.landmark_index = None
+        self.frame_times = None
+        self.landmark_max_age = None  # How far back a frame reuses landmarks, set from the frame times
+        self.capture = None
+        self.capture_position = 0
+        self.frame_count = 0
+        self.video_fps = Constants.DEFAULT_VIDEO_FPS
+        self.play_timer = QTimer(self)
+
+        # Connect signals
+        self.open_btn.clicked.connect(self.select_recording)
+        self.play_btn.clicked.connect(self.toggle_playback)
+        self.timeline_slider.valueChanged.connect(self.show_frame)
+        self.play_timer.timeout.connect(self.next_frame)
+
+        self.resize(Constants.TEXTURE_WIDTH + 20, Constants.TEXTURE_HEIGHT + 90)
+        self.show()
+
+    def select_recording(self):
+        """Pick another recording to review."""
+        filename = choose_recording(self)
+        if filename:
+            self.open_recording(filename)
+
+    def open_recording(self, csv_path):
+        """Open a recording pair written by MotionCaptureWindow, returning whether it opened."""
+        video_path = csv_path.replace('.csv', Constants.VIDEO_FORMAT)
+        if not os.path.exists(video_path):
+            QMessageBox.warning(self, "Warning", f"Video not found for {os.path.basename(csv_path)}.")
+            return False
+
+        self.close_recording()
+        try:
+            self.landmark_index = LandmarkIndex(csv_path)
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Error", f"Failed to read landmarks: {str(e)}")
+            return False
+
+        try:
+            self.frame_times = load_frame_times(csv_path.replace('.csv', '_frames.csv'))
+        except (OSError, ValueError, IndexError):
+            self.frame_times = None
+        if self.frame_times is not None and len(self.frame_times) > 1:
+            # Rows share the frame clock but exist only for inferred frames, reuse them for skipped ones like VideoThread
+            frame_interval = np.median(np.diff(self.frame_times))
+            max_stride = max(stride for _, _, stride in Constants.QUALITY_LEVELS + Constants.QUALITY_SHARED_LEVELS)
+            self.landmark_max_age = frame_interval * (max_stride - 0.5)
+
+        self.capture = cv2.VideoCapture(video_path)
+        self.capture_position = 0
+        self.frame_count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.video_fps = self.capture.get(cv2.CAP_PROP_FPS) or Constants.DEFAULT_VIDEO_FPS
+        self.cache = FrameCache()
+        self.prefetch_thread = PrefetchThread(video_path, self.cache, self.frame_count)
+        self.prefetch_thread.start()
+
+        self.setWindowTitle(f"Recording Review - {os.path.basename(csv_path)}")
+        self.timeline_slider.setRange(0, max(self.frame_count - 1, 0))
+        self.timeline_slider.setEnabled(True)
+        self.play_btn.setEnabled(True)
+        self.timeline_slider.setValue(0)
+        self.show_frame(0)
+        return True
+
+    def close_recording(self):
+        """Release the video, prefetch thread and landmark file of the open recording."""
+        self.play_timer.stop()
+        self.play_btn.setText("Play")
+        if self.prefetch_thread:
+            self.prefetch_thread.stop()
+            self.prefetch_thread = None
+        if self.capture:
+            self.capture.release()
+            self.capture = None
+        if self.landmark_index:
+            self.landmark_index.close()
+            self.landmark_index = None
+        self.frame_times = None
+        self.landmark_max_age = None
+        self.cache = None
+
+    def frame_time(self, index):
+        """Map a video frame to the CSV clock.
+
+        Recordings with a _frames.csv sidecar give the capture time of every
+        frame. Older ones only have a fixed-rate video, so their frames are
+        spread evenly over the recorded time range instead.
+        """
+        if self.frame_times is not None and len(self.frame_times):
+            return self.frame_times[min(index, len(self.frame_times) - 1)]
+        if self.frame_count <= 1:
+            return self.landmark_index.start_time
+        span = self.landmark_index.end_time - self.landmark_index.start_time
+        return self.landmark_index.start_time + span * index / (self.frame_count - 1)
+
+    def decode_frame(self, index):
+        """Decode a frame on a cache miss, seeking only when not already there."""
+        if index != self.capture_position:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+        ret, frame = self.capture.read()
+        self.capture_position = index + 1
+        if not ret:
+            return None
+        self.cache.put(index, frame)
+        return frame
+
+    def show_frame(self, index):
+        """Display a frame with its landmarks."""
+        if self.cache is None:
+            return
+        self.prefetch_thread.set_playhead(index)
+        frame = self.cache.get(index)
+        if frame is None:
+            frame = self.decode_frame(index)
+            if frame is None:
+                return
+
+        display_frame = frame.copy()
+        timestamp = self.frame_time(index)
+        if self.landmark_max_age is not None:
+            landmarks = self.landmark_index.landmarks_before(timestamp, self.landmark_max_age)
+        else:
+            tolerance = (self.landmark_index.end_time - self.landmark_index.start_time) / max(self.frame_count, 1)
+            landmarks = self.landmark_index.landmarks_at(timestamp, max(tolerance, 1.0 / self.video_fps))
+        if landmarks is not None:
+            self.draw_landmarks(display_frame, landmarks)
+
+        rgb_image = cv2.cvtColor(display_frame, cv2.COLOR_BGR2RGB)
+        h, w, ch = rgb_image.shape
+        bytes_per_line = ch * w
+        qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
+        self.video_label.setPixmap(QPixmap.fromImage(qt_image).scaled(
+            self.video_label.size(), Qt.AspectRatioMode.KeepAspectRatio))
+
+        self.frame_label.setText(f"Frame {index + 1}/{self.frame_count} - {datetime.fromtimestamp(timestamp)}")
+        lookups = self.cache.hits + self.cache.misses
+        hit_rate = 100.0 * self.cache.hits / lookups if lookups else 0.0
+        self.statusBar.showMessage(f"Cache: {len(self.cache)} frames, {hit_rate:.0f}% hits")
+
+    def draw_landmarks(self, image, landmarks):
+        """Draw recorded pose landmarks the same way VideoThread does."""
+        pose_landmarks = landmark_pb2.NormalizedLandmarkList()
+        for x, y, z, visibility in landmarks:
+            pose_landmarks.landmark.add(x=x, y=y, z=z, visibility=visibility)
+        self.mp_drawing.draw_landmarks(
+            image,
+            pose_landmarks,
+            self.mp_holistic.POSE_CONNECTIONS,
+            landmark_drawing_spec=self.drawing_spec
+        )
+
+    def toggle_playback(self):
+        """Start or pause playback at the video rate."""
+        if self.play_timer.isActive():
+            self.play_timer.stop()
+            self.play_btn.setText("Play")
+        else:
+            self.play_timer.start(int(1000 / self.video_fps))
+            self.play_btn.setText("Pause")
+
+    def next_frame(self):
+        """Advance playback by one frame."""
+        index = self.timeline_slider.value() + 1
+        if index >= self.frame_count:
+            self.toggle_playback()
+            return
+        self.timeline_slider.setValue(index)
+
+    def closeEvent(self, event):
+        """Handle window close event."""
+        self.close_recording()
+        event.accept()
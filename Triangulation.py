@@ -0,0 +1,224 @@
+from Calibration import load_calibration
+
+import Constants
+import argparse
+import csv
+import os
+import time
+from datetime import datetime, timedelta
+import cv2
+import numpy as np
+
+POSE_LANDMARKS = 33
+
+
+EPOCH = np.datetime64(0, 'us')
+EPOCH_DATETIME = datetime(1970, 1, 1)  # Inverse of load_recording, keeps the recorded wall clock
+
+
+def load_recording(path):
+    """Load a landmark CSV as (timestamps, landmarks) with landmarks shaped (frames, 33, 4).
+
+    Timestamps are seconds since the epoch of the naive recorded clock. Parsing
+    the text is the slow part, so the arrays are cached in a .npz next to the CSV
+    and reused until the CSV changes.
+    """
+    cache_path = os.path.splitext(path)[0] + '_landmarks.npz'
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+        with np.load(cache_path) as cache:
+            return cache['timestamps'], cache['landmarks']
+
+    columns = range(1, 1 + POSE_LANDMARKS * 4)
+    data = np.loadtxt(path, delimiter=';', skiprows=1, usecols=columns, ndmin=2)
+    stamps = np.loadtxt(path, delimiter=';', skiprows=1, usecols=0, dtype=str, ndmin=1)
+    timestamps = (stamps.astype('datetime64[us]') - EPOCH).astype(np.float64) / 1e6
+    landmarks = data.reshape(-1, POSE_LANDMARKS, 4)
+    try:
+        np.savez(cache_path, timestamps=timestamps, landmarks=landmarks)
+    except OSError:
+        pass  # Read-only folders just parse the CSV every time
+    return timestamps, landmarks
+
+
+def align_recordings(recordings, max_gap=Constants.TRIANGULATION_MAX_GAP):
+    """Interpolate every camera to the frames of the first one.
+
+    Cameras write rows only for inferred frames, every stride frames and with
+    their own phase, so each camera is linearly interpolated between the rows
+    around every reference timestamp. Returns the reference timestamps and
+    landmarks shaped (cameras, frames, 33, 4); frames outside a camera's rows,
+    across a gap longer than max_gap, or next to a row without the joint get
+    zero visibility.
+    """
+    reference, _ = recordings[0]
+    aligned = np.zeros((len(recordings), len(reference), POSE_LANDMARKS, 4))
+    for camera, (timestamps, landmarks) in enumerate(recordings):
+        if len(timestamps) == 0:
+            continue
+        order = np.argsort(timestamps)
+        timestamps, landmarks = timestamps[order], landmarks[order]
+
+        # Last row at or before and first row after every reference timestamp
+        after = np.searchsorted(timestamps, reference, side='right')
+        before = np.maximum(after - 1, 0)
+        exact = timestamps[before] == reference
+        after = np.minimum(after, len(timestamps) - 1)
+        gap = timestamps[after] - timestamps[before]
+        inside = (reference >= timestamps[0]) & (reference <= timestamps[-1])
+        matched = exact | (inside & (gap <= max_gap))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(exact | (gap <= 0), 0.0, (reference - timestamps[before]) / gap)
+
+        left, right = landmarks[before], landmarks[after]
+        aligned[camera] = left + (right - left) * weight[:, None, None]
+        # Rows with no pose are written as zeros and cannot be interpolated towards, keep the weaker visibility
+        found_left = (left[..., 0] != 0) | (left[..., 1] != 0)
+        found_right = (right[..., 0] != 0) | (right[..., 1] != 0)
+        usable = found_left & (found_right | exact[:, None]) & matched[:, None]
+        visibility = np.where(exact[:, None], left[..., 3], np.minimum(left[..., 3], right[..., 3]))
+        aligned[camera, ..., 3] = np.where(usable, visibility, 0.0)
+    return reference, aligned
+
+
+class Triangulator:
+    """Visibility-weighted DLT over every camera, joint and frame at once."""
+
+    def __init__(self, cameras, min_visibility=Constants.TRIANGULATION_MIN_VISIBILITY):
+        self.cameras = cameras
+        self.min_visibility = min_visibility
+        self.projections = np.stack([camera.projection_matrix() for camera in cameras])  # (C, 3, 4)
+
+        # Each camera adds the DLT rows w * (x * P3 - P1) and w * (y * P3 - P2), so its share of A^T A is
+        # w^2 * ((x^2 + y^2) P3 P3^T - x (P1 P3^T + P3 P1^T) - y (P2 P3^T + P3 P2^T) + P1 P1^T + P2 P2^T).
+        # Keeping the four constant matrices per camera turns every normal matrix into one matrix product.
+        terms = []
+        for P1, P2, P3 in self.projections:
+            terms.extend([np.outer(P3, P3), -(np.outer(P1, P3) + np.outer(P3, P1)),
+                          -(np.outer(P2, P3) + np.outer(P3, P2)), np.outer(P1, P1) + np.outer(P2, P2)])
+        # Only the top 3x4 block is needed to solve for [X Y Z] with the homogeneous coordinate fixed to 1
+        self.normal_terms = np.stack(terms)[:, :3, :].reshape(len(terms), 12)  # (4C, 12)
+
+    def undistort(self, landmarks):
+        """Convert normalized landmarks (C, ..., 4) to undistorted pixels (C, ..., 2) and weights (C, ...)."""
+        pixels = np.empty(landmarks.shape[:-1] + (2,))
+        for index, camera in enumerate(self.cameras):
+            width, height = camera.image_size
+            points = landmarks[index, ..., :2] * (width, height)
+            undistorted = cv2.undistortPoints(points.reshape(-1, 1, 2), camera.camera_matrix,
+                                              camera.dist_coeffs, P=camera.camera_matrix)
+            pixels[index] = undistorted.reshape(points.shape)
+        visibility = landmarks[..., 3]
+        # Rows with no pose are written as zeros
+        missing = (landmarks[..., 0] == 0) & (landmarks[..., 1] == 0)
+        weights = np.where((visibility >= self.min_visibility) & ~missing, visibility, 0.0)
+        return pixels, weights
+
+    def solve(self, pixels, weights):
+        """Triangulate pixels (C, N, 2) with weights (C, N) into points (N, 3), NaN where under two cameras see it."""
+        # Laid out as (N, C, 4) so the product below reads contiguous rows
+        squared = weights.T ** 2
+        x, y = pixels[..., 0].T, pixels[..., 1].T
+        coefficients = np.empty(squared.shape + (4,))
+        coefficients[..., 0] = squared * (x * x + y * y)
+        coefficients[..., 1] = squared * x
+        coefficients[..., 2] = squared * y
+        coefficients[..., 3] = squared
+        a, b, c, d, e, f, g, h, i, j, k, l = self.normal_terms.T @ coefficients.reshape(len(squared), -1).T
+
+        # Cramer's rule on [[a b c] [e f g] [i j k]] [X Y Z]^T = -[d h l]^T, cheaper than a batched LAPACK solve
+        cofactor0, cofactor1, cofactor2 = f * k - g * j, g * i - e * k, e * j - f * i
+        determinant = a * cofactor0 + b * cofactor1 + c * cofactor2
+        valid = (np.count_nonzero(weights > 0, axis=0) >= 2) & (determinant != 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            points = -np.stack([
+                d * cofactor0 + h * (c * j - b * k) + l * (b * g - c * f),
+                d * cofactor1 + h * (a * k - c * i) + l * (c * e - a * g),
+                d * cofactor2 + h * (b * i - a * j) + l * (a * f - b * e),
+            ], axis=-1) / determinant[:, None]
+        points[~valid] = np.nan
+        return points
+
+    def reprojection_error(self, points, pixels, weights):
+        """Mean pixel distance (N,) between projected points and the cameras that saw them."""
+        projected = points @ self.projections[:, :, :3].transpose(0, 2, 1) + self.projections[:, None, :, 3]  # (C, N, 3)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            dx = projected[..., 0] / projected[..., 2] - pixels[..., 0]
+            dy = projected[..., 1] / projected[..., 2] - pixels[..., 1]
+            seen = weights > 0
+            return np.where(seen, np.sqrt(dx * dx + dy * dy), 0.0).sum(axis=0) / np.count_nonzero(seen, axis=0)
+
+    def triangulate(self, landmarks, chunk_frames=Constants.TRIANGULATION_CHUNK_FRAMES):
+        """Triangulate aligned landmarks (C, T, 33, 4) into points (T, 33, 3) and errors (T, 33)."""
+        cameras, frames, joints, _ = landmarks.shape
+        points = np.full((frames, joints, 3), np.nan)
+        errors = np.full((frames, joints), np.nan)
+        # Chunks keep the per-joint coefficient arrays within memory on long sessions
+        for start in range(0, frames, chunk_frames):
+            chunk = landmarks[:, start:start + chunk_frames].reshape(cameras, -1, 4)
+            pixels, weights = self.undistort(chunk)
+            chunk_points = self.solve(pixels, weights)
+            count = chunk_points.shape[0] // joints
+            points[start:start + count] = chunk_points.reshape(count, joints, 3)
+            errors[start:start + count] = self.reprojection_error(chunk_points, pixels, weights).reshape(count, joints)
+        return points, errors
+
+    def triangulate_frame(self, landmarks_by_camera):
+        """Triangulate one synchronized live frame.
+
+        Takes one VideoThread landmark list per camera, in calibration order,
+        and returns points (33, 3) and errors (33,). Nothing in the app pairs
+        landmarks_ready emissions by capture time yet, so callers must pass
+        lists from the same instant themselves.
+        """
+        landmarks = np.array([values[1:1 + POSE_LANDMARKS * 4] for values in landmarks_by_camera], dtype=np.float64)
+        points, errors = self.triangulate(landmarks.reshape(len(self.cameras), 1, POSE_LANDMARKS, 4))
+        return points[0], errors[0]
+
+
+def save_points(path, timestamps, points, errors):
+    """Write triangulated points in the same layout as the landmark CSVs."""
+    with open(path, mode='w', newline='') as file:
+        writer = csv.writer(file, delimiter=';')
+        headers = ['timestamp']
+        for i in range(POSE_LANDMARKS):
+            headers.extend([f'pose_{i}_X', f'pose_{i}_Y', f'pose_{i}_Z', f'pose_{i}_err'])
+        writer.writerow(headers)
+        values = np.concatenate([points, errors[..., None]], axis=-1).reshape(len(timestamps), -1)
+        for timestamp, row in zip(timestamps, values):
+            writer.writerow([EPOCH_DATETIME + timedelta(seconds=float(timestamp))] + row.tolist())
+
+
+def main():
+    """Triangulate the recordings of a session into 3D landmarks."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('calibration', help="JSON written by Calibration.py")
+    parser.add_argument('recordings', nargs='+', help="One landmark CSV per camera, in calibration order")
+    parser.add_argument('-o', '--output', help="CSV for the 3D landmarks")
+    args = parser.parse_args()
+
+    cameras = load_calibration(args.calibration)
+    if len(cameras) != len(args.recordings):
+        parser.error(f"Calibration has {len(cameras)} cameras but {len(args.recordings)} recordings were given")
+
+    start = time.perf_counter()
+    timestamps, landmarks = align_recordings([load_recording(path) for path in args.recordings])
+    loaded = time.perf_counter()
+    points, errors = Triangulator(cameras).triangulate(landmarks)
+    finished = time.perf_counter()
+    print(f"Loaded {len(timestamps)} frames in {loaded - start:.2f} s, triangulated in {finished - loaded:.2f} s")
+
+    print("Reprojection error per joint (px): mean / median / triangulated frames")
+    for joint in range(POSE_LANDMARKS):
+        joint_errors = errors[:, joint][~np.isnan(errors[:, joint])]
+        if len(joint_errors):
+            print(f"  pose_{joint}: {joint_errors.mean():.2f} / {np.median(joint_errors):.2f} / {len(joint_errors)}")
+        else:
+            print(f"  pose_{joint}: not triangulated")
+
+    if args.output:
+        save_points(args.output, timestamps, points, errors)
+        print(f"Saved 3D landmarks to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import Constants
+from QualityController import QualityController
 import queue
 import time
 import mediapipe as mp
@@ -9,9 +10,10 @@ from PyQt6.QtCore import pyqtSignal as Signal, QThread
 
 class VideoThread(QThread):
     """Thread for video capture and landmark processing."""
-    frame_ready = Signal(np.ndarray)
+    frame_ready = Signal(np.ndarray, np.ndarray, float)  # Preview frame, undrawn frame and its capture time
     fps_updated = Signal(float)
     landmarks_ready = Signal(list)
+    quality_changed = Signal(dict)
 
     def __init__(self, camera_index=0):
         super().__init__()
@@ -25,17 +27,41 @@ class VideoThread(QThread):
         self.csv_queue = queue.Queue(maxsize=Constants.CSV_BUFFER_SIZE)
         self.drawing_spec = self.mp_drawing.DrawingSpec(thickness=2, circle_radius=1)
         self.model_complexity = 0  # Default model complexity
+        self.target_fps = None  # Adaptive quality targets, disabled when both are None
+        self.latency_budget_ms = None
+        self.quality_coordinator = None
+        self.inference_service = None  # Shared cross-camera inference, None runs a Holistic graph per thread
 
     def set_model_complexity(self, complexity):
         """Set the model complexity level."""
         self.model_complexity = complexity
 
+    def set_quality_target(self, target_fps=None, latency_budget_ms=None, coordinator=None):
+        """Enable the adaptive quality controller for the next run."""
+        self.target_fps = target_fps
+        self.latency_budget_ms = latency_budget_ms
+        self.quality_coordinator = coordinator
+
+    def set_inference_service(self, service):
+        """Send frames to a shared InferenceService instead of a per-thread Holistic graph."""
+        self.inference_service = service
+
+    def create_holistic(self, model_complexity):
+        """Create the MediaPipe Holistic graph for a complexity level."""
+        return self.mp_holistic.Holistic(
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5,
+            model_complexity=model_complexity,
+            enable_segmentation=False
+        )
+
     def run(self):
         """Main capture and processing loop."""
         cap = cv2.VideoCapture(self.camera_index)
         if not cap.isOpened():
             self.running = False
-            self.frame_ready.emit(np.zeros((Constants.TEXTURE_HEIGHT, Constants.TEXTURE_WIDTH, 3), dtype=np.uint8))
+            blank = np.zeros((Constants.TEXTURE_HEIGHT, Constants.TEXTURE_WIDTH, 3), dtype=np.uint8)
+            self.frame_ready.emit(blank, blank, time.time())
             self.fps_updated.emit(0.0)
             return
 
@@ -46,46 +72,101 @@ class VideoThread(QThread):
         start_time = time.time()
         frames_processed = 0
 
-        with self.mp_holistic.Holistic(
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5,
-            model_complexity=self.model_complexity,  # Use the selected model complexity
-            enable_segmentation=False
-        ) as holistic:
+        if self.inference_service is not None:
+            # The service ignores model complexity and inference scale, only step what it applies
+            controller = QualityController(self.target_fps, self.latency_budget_ms, 0, self.quality_coordinator,
+                                           cap.get(cv2.CAP_PROP_FPS), Constants.QUALITY_SHARED_LEVELS)
+        else:
+            controller = QualityController(self.target_fps, self.latency_budget_ms, self.model_complexity,
+                                           self.quality_coordinator, cap.get(cv2.CAP_PROP_FPS))
+        if controller.enabled:
+            change = controller.describe("start")
+            change['timestamp'] = time.time()
+            self.quality_changed.emit(change)
+        model_complexity = controller.model_complexity
+        holistic = None
+        if self.inference_service is not None:
+            self.inference_service.register(self.camera_index)
+        else:
+            holistic = self.create_holistic(model_complexity)
+        results = None
+
+        try:
             self.running = True
             while self.running:
                 ret, frame = cap.read()
                 if not ret:
                     break
-
-                # Process frame with MediaPipe
-                image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = holistic.process(image)
+                frame_start = time.perf_counter()
+                captured_at = time.time()
+
+                # Process frame with MediaPipe, skipping frames according to the inference stride
+                inference_latency = None
+                change = None
+                if self.inference_service is not None:
+                    # Hand the frame to the shared service and pick up the latest finished result
+                    if frames_processed % controller.inference_stride == 0:
+                        self.inference_service.submit(self.camera_index, frame, captured_at)
+                    served = self.inference_service.take_result(self.camera_index)
+                    if served is not None:
+                        results, served_captured_at, inference_latency = served
+                        if self.recording and results.pose_landmarks:
+                            landmarks = self.process_landmarks(results, served_captured_at)
+                            self.landmarks_ready.emit(landmarks)
+                        # Inference runs on the service thread, so adapt to the rate and latency of its results
+                        stride = controller.inference_stride
+                        change = controller.update(inference_latency / stride, inference_latency, stride)
+                elif results is None or frames_processed % controller.inference_stride == 0:
+                    inference_start = time.perf_counter()
+                    image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                    if controller.inference_scale != 1.0:
+                        image = cv2.resize(image, None, fx=controller.inference_scale,
+                                           fy=controller.inference_scale, interpolation=cv2.INTER_AREA)
+                    results = holistic.process(image)
+                    inference_latency = time.perf_counter() - inference_start
+
+                    # Process landmarks if recording
+                    if self.recording and (results.pose_landmarks or results.left_hand_landmarks or results.right_hand_landmarks):
+                        landmarks = self.process_landmarks(results, captured_at)
+                        self.landmarks_ready.emit(landmarks)
 
                 # Draw landmarks if enabled
                 display_frame = frame.copy()
-                if self.show_landmarks:
+                if self.show_landmarks and results is not None:
                     self.draw_landmarks(display_frame, results)
 
-                # Process landmarks if recording
-                if self.recording and (results.pose_landmarks or results.left_hand_landmarks or results.right_hand_landmarks):
-                    landmarks = self.process_landmarks(results, time.time())
-                    self.landmarks_ready.emit(landmarks)
-
                 # Calculate FPS
                 frames_processed += 1
                 elapsed_time = time.time() - start_time
                 fps = frames_processed / elapsed_time
 
                 # Emit signals
-                self.frame_ready.emit(display_frame)
+                self.frame_ready.emit(display_frame, frame, captured_at)
                 self.fps_updated.emit(fps)
 
+                # Adapt quality to the measured frame rate and latency
+                if self.inference_service is None:
+                    change = controller.update(time.perf_counter() - frame_start, inference_latency)
+                if change is not None:
+                    if holistic is not None and change['model_complexity'] != model_complexity:
+                        model_complexity = change['model_complexity']
+                        holistic.close()
+                        holistic = self.create_holistic(model_complexity)
+                    # Frames captured after this one use the new level, stamp it like the landmark rows
+                    change['timestamp'] = captured_at
+                    self.quality_changed.emit(change)
+
                 # Save frame if needed
                 try:
                     self.frame_queue.put(display_frame, block=False)
                 except queue.Full:
                     continue
+        finally:
+            if holistic is not None:
+                holistic.close()
+            else:
+                self.inference_service.unregister(self.camera_index)
+            controller.close()
 
         cap.release()
 
@@ -0,0 +1,78 @@
+import Constants
+import QualityController
+import pytest
+
+CAMERA_FPS = 30.0
+OVERHEAD = 0.004  # Per-frame work outside inference, in seconds
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(QualityController.time, 'perf_counter', clock)
+    monkeypatch.setattr(QualityController.psutil, 'cpu_percent', lambda interval=None: 30.0)
+    return clock
+
+
+def simulate(controller, clock, seconds, inference_cost):
+    """Run a camera-paced loop and return the (time, level) of every quality change."""
+    changes = []
+    frame = 0
+    end = clock.now + seconds
+    while clock.now < end:
+        latency = None
+        if frame % controller.inference_stride == 0:
+            latency = inference_cost[controller.model_complexity]
+        cost = OVERHEAD + (latency or 0.0)
+        clock.now += max(1.0 / CAMERA_FPS, cost)
+        frame += 1
+        if controller.update(cost, latency) is not None:
+            changes.append((clock.now, controller.level))
+    return changes
+
+
+def test_target_fps_settles_below_a_level_that_is_too_slow(clock):
+    # About 20 ms per frame at complexity 0 and 45 ms at complexity 1
+    controller = QualityController.QualityController(target_fps=30, capture_fps=CAMERA_FPS)
+    changes = simulate(controller, clock, 300, {0: 0.016, 1: 0.041, 2: 0.09})
+
+    assert [level for _, level in changes] == [4, 3]
+    assert controller.level == Constants.QUALITY_LEVELS.index((0, 1.0, 1))
+
+
+def test_latency_budget_settles_below_a_level_that_is_too_slow(clock):
+    controller = QualityController.QualityController(latency_budget_ms=30, capture_fps=CAMERA_FPS)
+    changes = simulate(controller, clock, 300, {0: 0.016, 1: 0.041, 2: 0.09})
+
+    assert [level for _, level in changes] == [4, 3]
+
+
+def test_steps_up_again_when_the_load_drops(clock):
+    controller = QualityController.QualityController(target_fps=30, capture_fps=CAMERA_FPS)
+    simulate(controller, clock, 60, {0: 0.016, 1: 0.041, 2: 0.09})
+    changes = simulate(controller, clock, 60, {0: 0.006, 1: 0.016, 2: 0.05})
+
+    assert changes[0][1] == 4
+    assert controller.level == 4
+
+
+def test_shared_service_results_step_down_the_stride(clock):
+    # The shared service needs 50 ms per frame of this camera, the controller only sees its results
+    controller = QualityController.QualityController(target_fps=30, capture_fps=CAMERA_FPS,
+                                                     levels=Constants.QUALITY_SHARED_LEVELS)
+    end = clock.now + 120
+    while clock.now < end:
+        stride = controller.inference_stride
+        latency = 0.05
+        clock.now += max(latency, stride / CAMERA_FPS)
+        controller.update(latency / stride, latency, stride)
+
+    assert controller.levels[controller.level] == (0, 1.0, 2)